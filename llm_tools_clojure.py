@@ -1,14 +1,513 @@
+import atexit
+import functools
+import json
 import llm
-import nrepl
 import os
+import queue
+import re
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from typing import Optional
 
 
+def _bencode_encode(value) -> bytes:
+    """Bencode a dict/list/str/int message for the nREPL transport."""
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    if isinstance(value, bytes):
+        return str(len(value)).encode() + b":" + value
+    if isinstance(value, int):
+        return b"i" + str(value).encode() + b"e"
+    if isinstance(value, (list, tuple)):
+        return b"l" + b"".join(_bencode_encode(item) for item in value) + b"e"
+    if isinstance(value, dict):
+        return b"d" + b"".join(
+            _bencode_encode(key) + _bencode_encode(value[key])
+            for key in sorted(value)
+        ) + b"e"
+    raise TypeError(f"Cannot bencode {type(value).__name__}")
+
+
+class _Incomplete(Exception):
+    """Raised by _bencode_decode when the buffer ends mid-value.
+
+    need is the buffer length the value requires, when a string length
+    prefix has already been read, and 0 otherwise.
+    """
+
+    def __init__(self, need: int = 0):
+        super().__init__(need)
+        self.need = need
+
+
+# Response keys whose strings are left as bytes, so that callers can
+# accumulate long output and decode it once
+_RAW_KEYS = frozenset(("value", "out", "err"))
+
+
+def _bencode_decode(buf, pos: int = 0, limit: Optional[int] = None):
+    """Decode one bencoded value from buf starting at pos.
+
+    Returns the value and the position just past it. Only buf[:limit] is
+    read, so a partly filled buffer can be decoded in place. Strings are
+    decoded as UTF-8, except dict values under _RAW_KEYS which stay bytes.
+    Lengths and delimiters are found with bytes.find rather than by
+    reading a byte at a time.
+    """
+    if limit is None:
+        limit = len(buf)
+    if pos >= limit:
+        raise _Incomplete
+    prefix = buf[pos]
+    if prefix == 0x69:  # i<int>e
+        end = buf.find(b"e", pos, limit)
+        if end < 0:
+            raise _Incomplete
+        return int(buf[pos + 1:end]), end + 1
+    if prefix == 0x6C:  # l...e
+        items = []
+        pos += 1
+        while True:
+            if pos >= limit:
+                raise _Incomplete
+            if buf[pos] == 0x65:
+                return items, pos + 1
+            item, pos = _bencode_decode(buf, pos, limit)
+            items.append(item)
+    if prefix == 0x64:  # d...e
+        items = {}
+        pos += 1
+        while True:
+            if pos >= limit:
+                raise _Incomplete
+            if buf[pos] == 0x65:
+                return items, pos + 1
+            key, pos = _bencode_decode(buf, pos, limit)
+            if key in _RAW_KEYS and pos < limit and buf[pos] not in b"ild":
+                items[key], pos = _bencode_bytes(buf, pos, limit)
+            else:
+                items[key], pos = _bencode_decode(buf, pos, limit)
+    value, end = _bencode_bytes(buf, pos, limit)
+    return value.decode("utf-8", errors="replace"), end
+
+
+def _bencode_bytes(buf, pos: int, limit: int):
+    """Decode a bencoded string at pos as bytes."""
+    colon = buf.find(b":", pos, limit)
+    if colon < 0:
+        raise _Incomplete
+    end = colon + 1 + int(buf[pos:colon])
+    if end > limit:
+        raise _Incomplete(end)
+    return bytes(buf[colon + 1:end]), end
+
+
+# Bencoded eval message: {"code": ..., "id": ..., "op": "eval", "session": ...}
+# in sorted key order, with only the code and id spliced in per request.
+_EVAL_PREFIX = b"d4:code"
+_EVAL_ID = b"2:id32:"
+
+
+def _eval_suffix(session: str) -> bytes:
+    """Encode the fixed tail of an eval message for a session."""
+    return b"2:op4:eval" + _bencode_encode("session") + _bencode_encode(session) + b"e"
+
+
+def _tune_socket(sock: socket.socket):
+    """Configure a socket for small, interactive nREPL messages.
+
+    TCP_NODELAY stops Nagle's algorithm from holding a request back while
+    the server delays its ACK; each message already goes out in one send.
+    SO_KEEPALIVE lets a long-idle pooled connection notice a dead server.
+    """
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+
+class _NotSent(ConnectionError):
+    """Raised when a request could not be written to a dead connection.
+
+    The server never received it, so unlike a connection lost while
+    waiting for the responses, it is safe to retry on a new connection.
+    """
+
+
+class _SharedConnection:
+    """An nREPL connection shared by every caller talking to the same server.
+
+    Requests are tagged with a unique id; a background reader routes each
+    response to the queue of the request that sent it, so several sessions
+    can have requests in flight on the one socket at the same time.
+
+    Each outgoing message is bencoded whole and written with one send.
+    """
+
+    # Initial read buffer size, and the free space below which it is
+    # compacted (or grown, if one response fills it) before receiving
+    _READ_BUFFER_SIZE = 65536
+    _MIN_RECV = 4096
+
+    def __init__(self, address: tuple, sock: socket.socket):
+        self.address = address
+        self._sock = sock
+        # Unread bytes are self._rbuf[self._rstart:self._rlen]
+        self._rbuf = bytearray(self._READ_BUFFER_SIZE)
+        self._rview = memoryview(self._rbuf)
+        self._rstart = 0
+        self._rlen = 0
+        self._write_lock = threading.Lock()
+        self._pending = {}
+        self._error = None
+        # Bumped by every eval that may change server state, so that
+        # cached query results from any session on this server go stale
+        self.state_epoch = 0
+        self._reader = threading.Thread(target=self._dispatch, daemon=True)
+        self._reader.start()
+
+    def _fill(self, need: int = 0):
+        """Receive more bytes straight into the free end of the read buffer.
+
+        need is the buffer length an incomplete response is known to
+        require. Receiving continues until it is reached, so a large
+        response is decoded once rather than re-parsed after every recv.
+        """
+        if self._rstart == self._rlen:
+            self._rstart = self._rlen = 0
+        elif self._rstart and (len(self._rbuf) - self._rlen < self._MIN_RECV
+                               or need > len(self._rbuf)):
+            # Move the partial response to the front
+            unread = self._rlen - self._rstart
+            self._rbuf[:unread] = self._rbuf[self._rstart:self._rlen]
+            need -= self._rstart
+            self._rstart, self._rlen = 0, unread
+
+        size = max(need, self._rlen + self._MIN_RECV)
+        if size > len(self._rbuf):
+            # A single response is larger than the buffer
+            self._rview.release()
+            self._rbuf.extend(bytes(max(size, 2 * len(self._rbuf)) - len(self._rbuf)))
+            self._rview = memoryview(self._rbuf)
+
+        while True:
+            n = self._sock.recv_into(self._rview[self._rlen:])
+            if not n:
+                raise ConnectionResetError("nREPL server closed the connection")
+            self._rlen += n
+            if self._rlen >= need:
+                return
+
+    def _read_all_available(self) -> list:
+        """Return every complete response in the buffer.
+
+        Receives only when not even one response is buffered, so frames
+        that arrived together are decoded together.
+        """
+        responses = []
+        while True:
+            try:
+                response, self._rstart = _bencode_decode(self._rbuf, self._rstart, self._rlen)
+            except _Incomplete as e:
+                if responses:
+                    return responses
+                self._fill(e.need)
+                continue
+            responses.append(response)
+
+    def _dispatch(self):
+        """Read responses and hand them to the waiting requests by id.
+
+        Each request is woken once per batch of its responses, not per frame.
+        """
+        try:
+            while True:
+                batches = {}
+                for response in self._read_all_available():
+                    batches.setdefault(response.get("id"), []).append(response)
+                for msg_id, responses in batches.items():
+                    pending = self._pending.get(msg_id)
+                    if pending is not None:
+                        pending.put(responses)
+        except Exception as e:
+            self._error = e if isinstance(e, OSError) else ConnectionResetError(str(e))
+            for pending in list(self._pending.values()):
+                pending.put(self._error)
+
+    def _write(self, data: bytes):
+        """Send an encoded message without interleaving it with other writers."""
+        with self._write_lock:
+            self._sock.sendall(data)
+
+    def send(self, message: dict):
+        """Send a message whose responses are not needed."""
+        if self._error is not None:
+            raise self._error
+        self._write(_bencode_encode(dict(message, id=uuid.uuid4().hex)))
+
+    def request(self, message: dict) -> list:
+        """Send a message and return its responses, up to and including 'done'."""
+        msg_id = uuid.uuid4().hex
+        return self._request(msg_id, _bencode_encode(dict(message, id=msg_id)))
+
+    def request_eval(self, code: bytes, suffix: bytes) -> list:
+        """Send an eval op built by splicing code into a preformatted message.
+
+        suffix is the session's encoded tail from _eval_suffix().
+        """
+        msg_id = uuid.uuid4().hex
+        return self._request(msg_id, b"".join((
+            _EVAL_PREFIX, str(len(code)).encode(), b":", code,
+            _EVAL_ID, msg_id.encode(), suffix,
+        )))
+
+    def _request(self, msg_id: str, data: bytes) -> list:
+        self._pending[msg_id] = queue.Queue()
+        try:
+            # Checked only once registered: the reader sets _error before
+            # failing the pending requests, so a failure either reaches this
+            # request's queue or is already visible here
+            if self._error is not None:
+                raise _NotSent(str(self._error)) from self._error
+            try:
+                self._write(data)
+            except OSError as e:
+                raise _NotSent(str(e)) from e
+            return self._drain_until_done(msg_id)
+        finally:
+            del self._pending[msg_id]
+
+    def _drain_until_done(self, msg_id: str) -> list:
+        """Collect the responses to msg_id, up to and including 'done'."""
+        pending = self._pending[msg_id]
+        responses = []
+        while True:
+            batch = pending.get()
+            if isinstance(batch, Exception):
+                raise batch
+            for response in batch:
+                responses.append(response)
+                if "status" in response and "done" in response["status"]:
+                    return responses
+
+    @property
+    def broken(self) -> bool:
+        return self._error is not None
+
+    def close(self):
+        # Shut the socket down first to wake the reader thread
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+
+
+_CONNECTIONS = {}
+_CONNECTIONS_LOCK = threading.Lock()
+
+
+def _shared_connection(port: str, host: str = "localhost") -> _SharedConnection:
+    """Return the pooled connection to host:port, connecting on first use."""
+    conn = _CONNECTIONS.get((host, port))
+    if conn is None or conn.broken:
+        with _CONNECTIONS_LOCK:
+            conn = _CONNECTIONS.get((host, port))
+            if conn is None or conn.broken:
+                sock = socket.create_connection((host, int(port)))
+                _tune_socket(sock)
+                conn = _SharedConnection((host, port), sock)
+                _CONNECTIONS[(host, port)] = conn
+    return conn
+
+
+def _discard_connection(conn: _SharedConnection):
+    """Drop a broken connection from the pool so the next caller reconnects."""
+    with _CONNECTIONS_LOCK:
+        if _CONNECTIONS.get(conn.address) is conn:
+            del _CONNECTIONS[conn.address]
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+@atexit.register
+def _close_connections():
+    with _CONNECTIONS_LOCK:
+        connections = list(_CONNECTIONS.values())
+        _CONNECTIONS.clear()
+    for conn in connections:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def _escape_string(text: str) -> str:
+    """Escape text for a Clojure string literal, skipping the scans it doesn't need."""
+    if "\\" in text:
+        text = text.replace("\\", "\\\\")
+    if '"' in text:
+        text = text.replace('"', '\\"')
+    return text
+
+
+def _read_port_file(port_path: str) -> str:
+    """Read a port file with one unbuffered read; port files are a few bytes."""
+    fd = os.open(port_path, os.O_RDONLY)
+    try:
+        data = os.read(fd, 32)
+    finally:
+        os.close(fd)
+    return data.decode("ascii").strip().rstrip('%')
+
+
+def _first_value(responses: list, default: str) -> str:
+    """Return the first 'value' among the responses to an eval op."""
+    for response in responses:
+        if "value" in response:
+            return response["value"].decode("utf-8", errors="replace")
+    return default
+
+
+def _format_eval_responses(responses: list) -> str:
+    """Format the responses to an eval op for display.
+
+    Output arrives in many small chunks; it is gathered as bytes and
+    decoded once.
+    """
+    results = []
+    outputs = bytearray()
+    errors = bytearray()
+
+    for response in responses:
+        # Collect different types of output
+        if "value" in response:
+            results.append(response["value"])
+        if "out" in response:
+            outputs += response["out"]
+        if "err" in response:
+            errors += response["err"]
+
+    # Format the response
+    result_parts = []
+
+    if outputs:
+        result_parts.append("Output:\n" + outputs.decode("utf-8", errors="replace"))
+
+    if results:
+        result_parts.append("Result: " + b" ".join(results).decode("utf-8", errors="replace"))
+
+    if errors:
+        result_parts.append("Errors:\n" + errors.decode("utf-8", errors="replace"))
+
+    if not result_parts:
+        return "Evaluation completed with no output"
+
+    return "\n".join(result_parts)
+
+
+# Wraps thunks for ClojureREPL._batch_eval; each yields [out value err].
+# The vector is returned printed, since the session's own *print-length*
+# or *print-level* would otherwise truncate it.
+_BATCH_TEMPLATE = """\
+(clojure.core/let [f (clojure.core/fn [thunk]
+  (clojure.core/let [o (java.io.StringWriter.)
+                     e (java.io.StringWriter.)
+                     w (java.io.PrintWriter. e)
+                     v (clojure.core/binding [clojure.core/*out* o
+                                              clojure.core/*err* w]
+                         (try
+                           (clojure.core/pr-str (thunk))
+                           (catch Throwable t
+                             (.print w (clojure.core/str t))
+                             "")))]
+    (.flush w)
+    [(clojure.core/str o) v (clojure.core/str e)]))
+                  results (clojure.core/into [] (clojure.core/concat {thunks}))]
+  (clojure.core/binding [clojure.core/*print-length* nil
+                         clojure.core/*print-level* nil]
+    (clojure.core/pr-str results)))"""
+
+_EDN_STRING_RE = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+
+
+def _read_string_vector(edn: str) -> list:
+    """Read the strings of a printed Clojure vector of strings.
+
+    Clojure escapes strings with a subset of JSON's escapes, so each
+    literal can be read with json.loads.
+    """
+    return [json.loads(literal, strict=False) for literal in _EDN_STRING_RE.findall(edn)]
+
+
+_QUERY_CACHE_SIZE = 256
+
+# Code that may define or remove namespaces, making required ones stale
+_NS_CHANGE_RE = re.compile(r"\((?:clojure\.core/)?(?:ns|remove-ns)\s")
+
+# A bare namespace symbol, as opposed to a libspec or flags like :reload
+_NS_SYMBOL_RE = re.compile(r"[^\s\[\](){}\"';:]+")
+
+
+def _cached_query(ttl: Optional[float] = None):
+    """Cache a read-only ClojureREPL query per instance.
+
+    Results are keyed on the method, its arguments, the REPL type and the
+    query epoch, so they go stale after any eval made through this
+    process's connection to the server. Evals from other nREPL clients,
+    such as an editor, are not seen. Error results are not cached. With
+    ttl, results also expire after that many seconds.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            epoch = self._query_epoch()
+            key = (method.__name__, self.repl_type, epoch,
+                   args, tuple(sorted(kwargs.items())))
+            now = time.monotonic()
+            cached = self._query_cache.get(key)
+            if cached is not None and (ttl is None or now - cached[1] < ttl):
+                self._query_cache.move_to_end(key)
+                return cached[0]
+
+            result = method(self, *args, **kwargs)
+            if epoch == self._query_epoch() and not result.startswith("Error"):
+                self._query_cache[key] = (result, now)
+                if len(self._query_cache) > _QUERY_CACHE_SIZE:
+                    self._query_cache.popitem(last=False)
+            return result
+        return wrapper
+    return decorator
+
+
 class ClojureREPL(llm.Toolbox):
     """A toolbox for interacting with a Clojure nREPL server."""
 
-    _connection = None
-    _session = None
+    # llm.Toolbox keeps a __dict__ for its own bookkeeping; slots give this
+    # class's own attributes fixed storage and faster access
+    __slots__ = (
+        "repl_type",
+        "_connection",
+        "_session",
+        "_eval_suffix",
+        "_cached_port",
+        "_cache_epoch",
+        "_query_cache",
+        "_loaded_ns",
+        "_bootstrap_thread",
+    )
+
+    # Eval code for the fixed-form tools, filled in with UTF-8 bytes
+    _REQUIRE_TEMPLATE = b"(require '%s)"
+    _DIR_TEMPLATE = b"(dir %s)"
+    _SOURCE_TEMPLATE = b"(source %s)"
+    _DOC_TEMPLATE = b"(doc %s)"
+    _META_TEMPLATE = b"(meta (var %s))"
+    _LIST_NAMESPACES_CODE = b"(sort (map str (all-ns)))"
+    _CLASSPATH_CODE = b'(System/getProperty "java.class.path")'
 
     def __init__(self, repl_type: str = "clj"):
         """Initialize the ClojureREPL toolbox.
@@ -19,21 +518,93 @@ class ClojureREPL(llm.Toolbox):
         if repl_type not in ["clj", "cljs"]:
             raise ValueError("repl_type must be either 'clj' or 'cljs'")
         self.repl_type = repl_type
+        self._connection = None
+        self._session = None
+        self._eval_suffix = None
+        self._cached_port = None
+        self._cache_epoch = 0
+        self._query_cache = OrderedDict()
+        self._loaded_ns = set()
+
+        # Connect and clone a session in the background, so the first tool
+        # call finds the session ready instead of waiting two round trips
+        self._bootstrap_thread = threading.Thread(target=self._bootstrap, daemon=True)
+        self._bootstrap_thread.start()
+
+    def _bootstrap(self):
+        try:
+            self._connect()
+        except Exception:
+            # _get_connection retries, and reports the error, on first use
+            pass
+
+    def _wait_for_bootstrap(self):
+        # Read once: another thread may clear the attribute after our check
+        thread = self._bootstrap_thread
+        if thread is not None:
+            thread.join()
+            self._bootstrap_thread = None
+
+    def _invalidate_queries(self):
+        """Drop cached query results after anything that may change REPL state."""
+        self._cache_epoch += 1
+        self._query_cache.clear()
+        connection = self._connection
+        if connection is not None:
+            connection.state_epoch += 1
+
+    def _query_epoch(self) -> tuple:
+        """Return the REPL state that cached query results are valid for."""
+        self._wait_for_bootstrap()
+        connection = self._connection
+        if connection is None:
+            return (self._cache_epoch, None, None)
+        return (self._cache_epoch, connection, connection.state_epoch)
 
     def _get_connection(self):
         """Establish connection to nREPL server if not already connected."""
+        self._wait_for_bootstrap()
+        if self._connection is not None and self._connection.broken:
+            self._reset_connection()
         if self._connection is None:
-            port = self._read_nrepl_port()
-            self._connection = nrepl.connect(f"nrepl://localhost:{port}")
-            # Create a session
-            self._connection.write({"op": "clone"})
-            response = self._connection.read()
-            self._session = response.get("new-session")
+            self._connect()
+        return self._connection
 
-            # Automatically require REPL utilities based on REPL type
-            self._setup_repl_environment()
+    def _reset_connection(self):
+        """Forget a broken connection and all state tied to its server.
 
-        return self._connection
+        The port file is re-read on the next connect, so a REPL restarted
+        on a new port is found again.
+        """
+        if self._connection is not None:
+            _discard_connection(self._connection)
+        self._connection = None
+        self._session = None
+        self._eval_suffix = None
+        self._cached_port = None
+        self._loaded_ns.clear()
+        self._invalidate_queries()
+
+    def _connect(self):
+        """Connect to the nREPL server and set up a session."""
+        port = self._read_nrepl_port()
+        try:
+            self._connection = _shared_connection(port)
+            self._clone_session()
+        except Exception:
+            # The port file may be stale; re-read it next time
+            self._connection = None
+            self._cached_port = None
+            raise
+
+        # Automatically require REPL utilities based on REPL type
+        self._setup_repl_environment()
+
+    def _clone_session(self):
+        """Create this toolbox's own session on the shared connection."""
+        responses = self._connection.request({"op": "clone"})
+        self._session = responses[0].get("new-session")
+        self._eval_suffix = _eval_suffix(self._session)
 
     def _setup_repl_environment(self):
         """Set up the REPL environment with necessary requires."""
@@ -45,19 +616,13 @@ class ClojureREPL(llm.Toolbox):
                 # For Clojure
                 require_code = "(require '[clojure.repl :refer :all])"
 
-            # Execute the require statement
-            self._connection.write({
+            # Nothing waits for the require's responses
+            self._connection.send({
                 "op": "eval",
                 "code": require_code,
                 "session": self._session
             })
 
-            # Read responses until done
-            while True:
-                response = self._connection.read()
-                if "status" in response and "done" in response["status"]:
-                    break
-
         except Exception as e:
             # Don't fail connection if require fails, just continue
             # This allows the REPL to work even if the namespace isn't available
@@ -69,25 +634,34 @@ class ClojureREPL(llm.Toolbox):
         Searches current directory and parent directories for:
         - .nrepl-port (for clj)
         - .shadow-cljs/nrepl.port (for cljs)
+
+        The port is cached on the instance until the connection is closed.
         """
+        if self._cached_port:
+            return self._cached_port
+
         if self.repl_type == "cljs":
             port_file = ".shadow-cljs/nrepl.port"
         else:
             port_file = ".nrepl-port"
 
-        # Start from current directory and search upwards
+        # Start from current directory and search upwards, trying to open
+        # the port file directly rather than checking for it first
+        suffix = os.sep + port_file
         current_dir = os.getcwd()
 
         while True:
-            port_path = os.path.join(current_dir, port_file)
-
-            if os.path.exists(port_path):
-                try:
-                    with open(port_path, "r") as f:
-                        port = f.read().strip().rstrip('%')
-                        return port
-                except Exception as e:
-                    raise Exception(f"Error reading port file {port_path}: {e}")
+            port_path = current_dir.rstrip(os.sep) + suffix
+
+            try:
+                port = _read_port_file(port_path)
+            except (FileNotFoundError, NotADirectoryError):
+                pass
+            except Exception as e:
+                raise Exception(f"Error reading port file {port_path}: {e}")
+            else:
+                self._cached_port = port
+                return port
 
             # Move to parent directory
             parent_dir = os.path.dirname(current_dir)
@@ -113,71 +687,119 @@ class ClojureREPL(llm.Toolbox):
         Returns:
             The result of the evaluation or error message
         """
-        try:
-            conn = self._get_connection()
-
-            # Send the evaluation request
-            conn.write({
-                "op": "eval",
-                "code": code,
-                "session": self._session
-            })
-
-            # Collect all responses until we get 'done' status
-            results = []
-            outputs = []
-            errors = []
-
-            while True:
-                response = conn.read()
+        self._invalidate_queries()
+        if _NS_CHANGE_RE.search(code):
+            self._loaded_ns.clear()
+        return self._eval(code)
 
-                # Collect different types of output
-                if "value" in response:
-                    results.append(response["value"])
-                if "out" in response:
-                    outputs.append(response["out"])
-                if "err" in response:
-                    errors.append(response["err"])
+    def _eval(self, code: str) -> str:
+        """Evaluate code without invalidating cached query results."""
+        return self._eval_bytes(code.encode("utf-8"))
 
-                # Check if evaluation is complete
-                if "status" in response and "done" in response["status"]:
-                    break
-
-            # Format the response
-            result_parts = []
-
-            if outputs:
-                result_parts.append("Output:\n" + "".join(outputs))
+    def _eval_bytes(self, code: bytes) -> str:
+        """Evaluate UTF-8 encoded code without invalidating cached query results."""
+        try:
+            return _format_eval_responses(self._eval_responses(code))
+        except Exception as e:
+            return f"Error evaluating Clojure code: {str(e)}"
 
-            if results:
-                result_parts.append("Result: " + " ".join(results))
+    def _eval_responses(self, code: bytes) -> list:
+        """Send an eval request and collect its responses until 'done'.
 
-            if errors:
-                result_parts.append("Errors:\n" + "".join(errors))
+        If the connection turns out to be dead before the request is sent,
+        reconnects once and retries. A connection lost after sending is not
+        retried, since the code may already have run.
+        """
+        conn = self._get_connection()
+        try:
+            return conn.request_eval(code, self._eval_suffix)
+        except _NotSent:
+            self._reset_connection()
+            conn = self._get_connection()
+            return conn.request_eval(code, self._eval_suffix)
 
-            if not result_parts:
-                return "Evaluation completed with no output"
+    def batch_eval(self, forms: list[str]) -> str:
+        """
+        Evaluate several Clojure forms in a single round trip.
+        Prefer this over separate calls when looking up several things at
+        once, e.g. ["(doc map)", "(source filter)", "(meta #'reduce)"].
+        Forms run in order, so later forms see earlier definitions, and an
+        error in one form does not stop the rest.
 
-            return "\n".join(result_parts)
+        Args:
+            forms: The Clojure forms to evaluate, in order
 
+        Returns:
+            The output and result of each form, in order
+        """
+        if not forms:
+            return "No forms to evaluate"
+        self._invalidate_queries()
+        if any(_NS_CHANGE_RE.search(form) for form in forms):
+            self._loaded_ns.clear()
+        try:
+            results, other = self._batch_eval(forms)
         except Exception as e:
             return f"Error evaluating Clojure code: {str(e)}"
+        sections = [f"=== {form}\n{result}" for form, result in zip(forms, results)]
+        if other is not None:
+            sections.append(f"=== Outside any form\n{other}")
+        return "\n\n".join(sections)
+
+    def _batch_eval(self, codes: list) -> tuple:
+        """Evaluate forms in one eval op and return each one's formatted result.
+
+        Each form runs in its own thunk that captures its output, error
+        output and printed value (or exception), and the batch returns them
+        as one flat vector of strings. The thunks eval their quoted form, so
+        each one is only compiled once the forms before it have run.
+
+        Also returns any output the server sent outside the thunks,
+        formatted, or None. ClojureScript has no runtime eval, so there the
+        forms are sent one eval op each.
+        """
+        if self.repl_type == "cljs":
+            return [self._eval(code) for code in codes], None
+        thunks = " ".join(
+            f"(f (clojure.core/fn [] (clojure.core/eval (quote (do {code}\n)))))"
+            for code in codes
+        )
+        code = _BATCH_TEMPLATE.format(thunks=thunks)
+
+        responses = self._eval_responses(code.encode("utf-8"))
+        value = _first_value(responses, None)
+        if value is None:
+            # The batch failed as a whole, e.g. one form does not compile
+            raise Exception(_format_eval_responses(responses))
+
+        fields = _read_string_vector(json.loads(value, strict=False))
+        if len(fields) != 3 * len(codes):
+            raise Exception(
+                f"Expected {3 * len(codes)} strings in the batch result, got {len(fields)}"
+            )
+        results = []
+        for out, printed, err in zip(fields[::3], fields[1::3], fields[2::3]):
+            response = {}
+            if out:
+                response["out"] = out.encode("utf-8")
+            if printed:
+                response["value"] = printed.encode("utf-8")
+            if err:
+                response["err"] = err.encode("utf-8")
+            results.append(_format_eval_responses([response]))
+
+        other = [
+            {key: response[key] for key in ("out", "err") if key in response}
+            for response in responses
+            if "out" in response or "err" in response
+        ]
+        return results, (_format_eval_responses(other) if other else None)
 
     def get_namespace(self) -> str:
         """Get the current namespace of the REPL session."""
         try:
-            conn = self._get_connection()
-            conn.write({
-                "op": "eval",
-                "code": "*ns*",
-                "session": self._session
-            })
-
-            response = conn.read()
-            namespace = response.get("value", "unknown")
-
-            # Read the 'done' status
-            conn.read()
+            responses = self._eval_responses(b"*ns*")
+            namespace = _first_value(responses, "unknown")
 
             return f"Current namespace: {namespace}"
         except Exception as e:
@@ -216,21 +838,39 @@ class ClojureREPL(llm.Toolbox):
         Returns:
             Result of requiring the namespace
         """
-        code = f"(require '{namespace})"
-        return self.eval_clojure(code)
+        if namespace in self._loaded_ns:
+            return f"Already required: {namespace}"
+
+        self._invalidate_queries()
+        result = self._eval_bytes(self._REQUIRE_TEMPLATE % namespace.encode("utf-8"))
+        # Only bare symbols are remembered, so libspecs and :reload or
+        # :reload-all are sent every time
+        if (_NS_SYMBOL_RE.fullmatch(namespace)
+                and not result.startswith("Error") and "Errors:\n" not in result):
+            self._loaded_ns.add(namespace)
+        return result
 
     def _close_connection(self) -> str:
-        """Close the nREPL connection."""
+        """Close this toolbox's nREPL session.
+
+        The socket itself stays pooled for other sessions and is closed at exit.
+        """
+        self._invalidate_queries()
+        self._wait_for_bootstrap()
         try:
             if self._connection:
-                self._connection.close()
+                self._connection.request({"op": "close", "session": self._session})
                 self._connection = None
                 self._session = None
+                self._cached_port = None
+                self._loaded_ns.clear()
                 return "nREPL connection closed"
             else:
                 return "No active connection to close"
         except Exception as e:
             return f"Error closing connection: {str(e)}"
+
+    @_cached_query()
     def dir_namespace(self, namespace: str) -> str:
         """
         Print a sorted directory of public vars in a namespace.
@@ -241,8 +881,7 @@ class ClojureREPL(llm.Toolbox):
         Returns:
             Sorted list of public vars in the namespace
         """
-        code = f"(dir {namespace})"
-        return self.eval_clojure(code)
+        return self._eval_bytes(self._DIR_TEMPLATE % namespace.encode("utf-8"))
 
     def apropos(self, pattern: str) -> str:
         """
@@ -254,11 +893,12 @@ class ClojureREPL(llm.Toolbox):
         Returns:
             Sequence of all public definitions matching the pattern
         """
-        # Escape quotes in the pattern and wrap in quotes
-        escaped_pattern = pattern.replace('"', '\\"')
+        # Escape the pattern and wrap in quotes
+        escaped_pattern = _escape_string(pattern)
         code = f'(apropos "{escaped_pattern}")'
-        return self.eval_clojure(code)
+        return self._eval(code)
 
+    @_cached_query()
     def source(self, symbol: str) -> str:
         """
         Print the source code for a given symbol.
@@ -269,8 +909,7 @@ class ClojureREPL(llm.Toolbox):
         Returns:
             Source code for the symbol if available
         """
-        code = f"(source {symbol})"
-        return self.eval_clojure(code)
+        return self._eval_bytes(self._SOURCE_TEMPLATE % symbol.encode("utf-8"))
 
     def find_doc(self, pattern: str) -> str:
         """
@@ -282,10 +921,11 @@ class ClojureREPL(llm.Toolbox):
         Returns:
             Documentation for symbols matching the pattern
         """
-        escaped_pattern = pattern.replace('"', '\\"')
+        escaped_pattern = _escape_string(pattern)
         code = f'(find-doc "{escaped_pattern}")'
-        return self.eval_clojure(code)
+        return self._eval(code)
 
+    @_cached_query()
     def doc(self, symbol: str) -> str:
         """
         Print documentation for a symbol.
@@ -296,9 +936,9 @@ class ClojureREPL(llm.Toolbox):
         Returns:
             Documentation for the symbol
         """
-        code = f"(doc {symbol})"
-        return self.eval_clojure(code)
+        return self._eval_bytes(self._DOC_TEMPLATE % symbol.encode("utf-8"))
 
+    @_cached_query()
     def list_namespaces(self) -> str:
         """
         List all currently loaded namespaces.
@@ -306,9 +946,9 @@ class ClojureREPL(llm.Toolbox):
         Returns:
             List of all loaded namespaces
         """
-        code = "(sort (map str (all-ns)))"
-        return self.eval_clojure(code)
+        return self._eval_bytes(self._LIST_NAMESPACES_CODE)
 
+    @_cached_query()
     def inspect_var(self, var_name: str) -> str:
         """
         Get detailed information about a var including metadata.
@@ -319,9 +959,9 @@ class ClojureREPL(llm.Toolbox):
         Returns:
             Detailed information about the var
         """
-        code = f"(meta (var {var_name}))"
-        return self.eval_clojure(code)
+        return self._eval_bytes(self._META_TEMPLATE % var_name.encode("utf-8"))
 
+    @_cached_query(ttl=5.0)
     def show_classpath(self) -> str:
         """
         Show the current classpath.
@@ -329,8 +969,11 @@ class ClojureREPL(llm.Toolbox):
         Returns:
             Current Java classpath
         """
-        code = "(System/getProperty \"java.class.path\")"
-        return self.eval_clojure(code)
+        return self._eval_bytes(self._CLASSPATH_CODE)
+
+
+# Port read from .nrepl-port, keyed by working directory
+_PORT_CACHE = {}
 
 
 # Alternative functional approach using hookimpl
@@ -345,25 +988,31 @@ def eval_clojure_simple(code: str) -> str:
         The result of the evaluation
     """
     try:
-        # Read port from .nrepl-port file
-        with open(".nrepl-port", "r") as f:
-            port = f.read().strip().rstrip('%')
-
-        # Connect and evaluate
-        conn = nrepl.connect(f"nrepl://localhost:{port}")
-        conn.write({"op": "eval", "code": code})
-
-        # Read response
-        response = conn.read()
-        result = response.get("value", "No result")
-
-        # Read 'done' status
-        conn.read()
-        conn.close()
+        # Read port from .nrepl-port file, once per working directory
+        cwd = os.getcwd()
+        port = _PORT_CACHE.get(cwd)
+        if port is None:
+            port = _read_port_file(".nrepl-port")
+            _PORT_CACHE[cwd] = port
+
+        # Evaluate on the pooled connection, reconnecting once if it went
+        # stale before the code was sent. The eval may change state, staling
+        # ClojureREPL's cached queries
+        conn = _shared_connection(port)
+        try:
+            conn.state_epoch += 1
+            responses = conn.request({"op": "eval", "code": code})
+        except _NotSent:
+            _discard_connection(conn)
+            conn = _shared_connection(port)
+            conn.state_epoch += 1
+            responses = conn.request({"op": "eval", "code": code})
 
-        return result
+        return _first_value(responses, "No result")
 
     except Exception as e:
+        # The port file may be stale; re-read it on the next call
+        _PORT_CACHE.pop(os.getcwd(), None)
         return f"Error: {str(e)}"
 
 
@@ -0,0 +1,465 @@
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+import llm_tools_clojure
+from llm_tools_clojure import (
+    ClojureREPL,
+    _Incomplete,
+    _SharedConnection,
+    _bencode_decode,
+    _bencode_encode,
+    _read_string_vector,
+)
+
+
+def test_bencode_round_trip():
+    message = {
+        "op": "eval",
+        "code": "(println \"héllo\")",
+        "id": "abc",
+        "count": -42,
+        "status": ["done", "eval-error"],
+        "nested": {"empty": "", "items": [1, [2, "three"], {}]},
+    }
+    encoded = _bencode_encode(message)
+    assert _bencode_decode(encoded) == (message, len(encoded))
+
+
+def test_bencode_encode_sorts_keys_and_counts_bytes():
+    assert _bencode_encode({"op": "clone", "id": "é"}) == b"d2:id2:\xc3\xa92:op5:clonee"
+
+
+def test_bencode_decode_respects_pos_and_limit():
+    buf = b"xx" + _bencode_encode("abc") + b"i7e"
+    assert _bencode_decode(buf, 2) == ("abc", 7)
+    assert _bencode_decode(buf, 7) == (7, 10)
+    with pytest.raises(_Incomplete):
+        _bencode_decode(buf, 7, 9)
+
+
+@pytest.mark.parametrize("value", [
+    {"out": "x" * 100, "id": "1", "status": ["done"]},
+    [1, "two", {"three": 3}],
+    123456,
+])
+def test_bencode_decode_truncated(value):
+    encoded = _bencode_encode(value)
+    for cut in range(len(encoded)):
+        with pytest.raises(_Incomplete):
+            _bencode_decode(encoded[:cut])
+
+
+def test_incomplete_need_after_length_prefix():
+    encoded = _bencode_encode({"id": "1", "out": "x" * 1000})
+    string_start = encoded.index(b"1000:")
+    # Before the length prefix is complete, the needed length is unknown
+    with pytest.raises(_Incomplete) as info:
+        _bencode_decode(encoded[:string_start + 2])
+    assert info.value.need == 0
+    # Once it is read, need is the end of the string
+    with pytest.raises(_Incomplete) as info:
+        _bencode_decode(encoded[:string_start + 10])
+    assert info.value.need == string_start + 5 + 1000
+
+
+def test_raw_keys_decode_as_bytes():
+    encoded = _bencode_encode({
+        "value": "é", "out": "out", "err": "err", "ns": "user", "id": "1",
+    })
+    response, _ = _bencode_decode(encoded)
+    assert response == {
+        "value": "é".encode("utf-8"),
+        "out": b"out",
+        "err": b"err",
+        "ns": "user",
+        "id": "1",
+    }
+
+
+def test_raw_keys_only_apply_to_strings():
+    encoded = _bencode_encode({"value": ["a"], "out": 1})
+    assert _bencode_decode(encoded)[0] == {"value": ["a"], "out": 1}
+
+
+def test_read_string_vector():
+    # As printed by pr-str, which escapes quotes, backslashes and control
+    # characters and leaves other characters as they are
+    edn = r'["out\nline\r\n" "\"quoted\" C:\\dir" "tab\tff\fbs\b" "héllo ☃"]'
+    assert _read_string_vector(edn) == [
+        "out\nline\r\n", '"quoted" C:\\dir', "tab\tff\fbs\b", "héllo ☃",
+    ]
+
+
+def test_read_string_vector_nested_printed_values():
+    # A batch result holds values that were themselves printed with pr-str
+    edn = r'["" "\"v1\"" "" "" "[\"a\" \\b]" ""]'
+    assert _read_string_vector(edn) == ["", '"v1"', "", "", '["a" \\b]', ""]
+
+
+def test_read_string_vector_empty():
+    assert _read_string_vector("[]") == []
+    assert _read_string_vector('["" "" ""]') == ["", "", ""]
+
+
+def _serve(sock, respond, chunk_size):
+    """Answer each message read from sock with the frames respond() returns,
+    written chunk_size bytes at a time. Hangs up if respond() returns None,
+    and stops when the client hangs up."""
+    buf = bytearray()
+    with sock:
+        try:
+            while True:
+                try:
+                    message, end = _bencode_decode(buf)
+                except _Incomplete:
+                    data = sock.recv(65536)
+                    if not data:
+                        return
+                    buf += data
+                    continue
+                del buf[:end]
+                frames = respond(message)
+                if frames is None:
+                    return
+                data = b"".join(_bencode_encode(frame) for frame in frames)
+                step = chunk_size or len(data)
+                for i in range(0, len(data), step):
+                    sock.sendall(data[i:i + step])
+        except OSError:
+            return
+
+
+@pytest.fixture
+def connect():
+    connections = []
+
+    def connect(respond, chunk_size=None, address=("test", "0")):
+        client, server = socket.socketpair()
+        threading.Thread(
+            target=_serve, args=(server, respond, chunk_size), daemon=True
+        ).start()
+        conn = _SharedConnection(address, client)
+        connections.append(conn)
+        return conn
+
+    yield connect
+    for conn in connections:
+        conn.close()
+
+
+def test_reader_frame_larger_than_buffer_split_across_recvs(connect):
+    big = "é" * 100000
+
+    def respond(message):
+        return [
+            {"id": message["id"], "out": big},
+            {"id": message["id"], "status": ["done"]},
+        ]
+
+    conn = connect(respond, chunk_size=1000)
+    responses = conn.request({"op": "eval", "code": "(big)"})
+    assert responses[0]["out"] == big.encode("utf-8")
+    assert responses[-1]["status"] == ["done"]
+    assert len(conn._rbuf) > _SharedConnection._READ_BUFFER_SIZE
+
+
+def test_reader_many_frames_per_recv(connect):
+    def respond(message):
+        frames = [{"id": message["id"], "out": str(i)} for i in range(50)]
+        return frames + [{"id": message["id"], "status": ["done"]}]
+
+    conn = connect(respond)
+    responses = conn.request({"op": "eval", "code": "(many)"})
+    assert b"".join(r.get("out", b"") for r in responses) == "".join(
+        str(i) for i in range(50)
+    ).encode()
+    assert len(responses) == 51
+
+
+def test_reader_compacts_instead_of_growing(connect):
+    # 200KB of 10KB frames arriving in chunks that straddle frame
+    # boundaries: partial frames are moved to the front of the buffer, so
+    # it never needs to grow
+    def respond(message):
+        frames = [
+            {"id": message["id"], "out": f"{i:05d}" * 2000} for i in range(20)
+        ]
+        return frames + [{"id": message["id"], "status": ["done"]}]
+
+    conn = connect(respond, chunk_size=7000)
+    for _ in range(3):
+        responses = conn.request({"op": "eval", "code": "(frames)"})
+        assert [r["out"] for r in responses[:-1]] == [
+            f"{i:05d}".encode() * 2000 for i in range(20)
+        ]
+    assert len(conn._rbuf) == _SharedConnection._READ_BUFFER_SIZE
+
+
+def test_reader_routes_responses_by_id(connect):
+    def respond(message):
+        # Stray frames for other ids are ignored
+        return [
+            {"id": "someone-else", "value": "nope"},
+            {"id": message["id"], "value": message["code"]},
+            {"id": message["id"], "status": ["done"]},
+        ]
+
+    conn = connect(respond)
+    responses = conn.request({"op": "eval", "code": "1"})
+    assert [r.get("value") for r in responses] == [b"1", None]
+
+
+def test_reader_failure_fails_requests(connect):
+    def respond(message):
+        return None
+
+    conn = connect(respond)
+    with pytest.raises(ConnectionResetError):
+        conn.request({"op": "eval", "code": "1"})
+    assert conn.broken
+
+
+class FakeNREPL:
+    """A REPL server that records the code it is sent.
+
+    Evals answer with the frames handler returns for the code, if it is
+    set and returns any; otherwise with the value in values, or "nil", and
+    any text in errors written to err. Code containing "(crash)" makes the
+    server hang up instead of answering.
+    """
+
+    def __init__(self):
+        self.evals = []
+        self.values = {}
+        self.errors = {}
+        self.handler = None
+        self.sessions = 0
+
+    def __call__(self, message):
+        reply = {"id": message["id"], "status": ["done"]}
+        if message["op"] == "clone":
+            self.sessions += 1
+            reply["new-session"] = f"session-{self.sessions}"
+        elif message["op"] == "eval":
+            self.evals.append(message["code"])
+            if "(crash)" in message["code"]:
+                return None
+            frames = self.handler and self.handler(message["code"])
+            if frames:
+                return [dict(frame, id=message["id"]) for frame in frames] + [reply]
+            reply["value"] = self.values.get(message["code"], "nil")
+            if message["code"] in self.errors:
+                return [{"id": message["id"], "err": self.errors[message["code"]]}, reply]
+        return [reply]
+
+    def count(self, code):
+        return self.evals.count(code)
+
+
+@pytest.fixture
+def servers(connect, monkeypatch, tmp_path):
+    """Fake REPL servers by port, reached through a fake connection pool."""
+    servers = {"7888": FakeNREPL()}
+    pool = {}
+    lock = threading.Lock()
+
+    def shared_connection(port, host="localhost"):
+        with lock:
+            conn = pool.get((host, port))
+            if conn is None or conn.broken:
+                server = servers.setdefault(port, FakeNREPL())
+                conn = pool[(host, port)] = connect(server, address=(host, port))
+            return conn
+
+    monkeypatch.setattr(llm_tools_clojure, "_CONNECTIONS", pool)
+    monkeypatch.setattr(llm_tools_clojure, "_shared_connection", shared_connection)
+    monkeypatch.setattr(llm_tools_clojure, "_PORT_CACHE", {})
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ".nrepl-port").write_text("7888")
+    return servers
+
+
+def test_reconnects_to_restarted_repl(servers, tmp_path):
+    repl = ClojureREPL()
+    assert repl.eval_clojure("(+ 1 2)") == "Result: nil"
+    first = repl._connection
+
+    # The REPL dies mid-eval and comes back on another port
+    assert repl.eval_clojure("(crash)").startswith("Error")
+    (tmp_path / ".nrepl-port").write_text("7889")
+    servers.setdefault("7889", FakeNREPL()).values["(+ 1 2)"] = "3"
+    assert repl.eval_clojure("(+ 1 2)") == "Result: 3"
+    assert repl._connection is not first
+    assert repl._session == "session-1"
+    # The code that was running when the connection died is not re-run
+    assert servers["7888"].count("(crash)") == 1
+
+
+def test_retries_eval_that_was_never_sent(servers):
+    repl = ClojureREPL()
+    repl._wait_for_bootstrap()
+    first = repl._connection
+
+    def write(data):
+        raise BrokenPipeError("dead")
+
+    first._write = write
+    assert repl.eval_clojure("(inc 1)") == "Result: nil"
+    assert repl._connection is not first
+    assert servers["7888"].count("(inc 1)") == 1
+
+
+def test_eval_clojure_simple_does_not_rerun_lost_eval(servers):
+    assert llm_tools_clojure.eval_clojure_simple("(crash)").startswith("Error")
+    assert llm_tools_clojure.eval_clojure_simple("(inc 1)") == "nil"
+    assert servers["7888"].count("(crash)") == 1
+
+
+def test_query_cached_until_eval(servers):
+    repl = ClojureREPL()
+    server = servers["7888"]
+    server.values["(doc map)"] = '"map doc"'
+    assert repl.doc("map") == 'Result: "map doc"'
+    assert repl.doc("map") == 'Result: "map doc"'
+    assert server.count("(doc map)") == 1
+
+    repl.eval_clojure("(defn map [])")
+    repl.doc("map")
+    assert server.count("(doc map)") == 2
+
+
+def test_query_cache_shared_state_across_sessions(servers):
+    repl, other = ClojureREPL(), ClojureREPL()
+    repl.doc("map")
+    assert repl._connection is other._connection
+
+    # Evals from another session, or from eval_clojure_simple, on the same
+    # server make the cached result stale
+    other.eval_clojure("(def x 1)")
+    repl.doc("map")
+    llm_tools_clojure.eval_clojure_simple("(def y 2)")
+    repl.doc("map")
+    assert servers["7888"].count("(doc map)") == 3
+    repl.doc("map")
+    assert servers["7888"].count("(doc map)") == 3
+
+
+def test_query_errors_not_cached(servers):
+    repl = ClojureREPL()
+    assert repl.doc("(crash)").startswith("Error")
+    assert repl.doc("(crash)").startswith("Error")
+    assert servers["7888"].count("(doc (crash))") == 2
+
+
+def test_show_classpath_expires(servers, monkeypatch):
+    repl = ClojureREPL()
+    clock = [time.monotonic()]
+    monkeypatch.setattr(llm_tools_clojure.time, "monotonic", lambda: clock[0])
+    code = '(System/getProperty "java.class.path")'
+    repl.show_classpath()
+    clock[0] += 4
+    repl.show_classpath()
+    assert servers["7888"].count(code) == 1
+    clock[0] += 2
+    repl.show_classpath()
+    assert servers["7888"].count(code) == 2
+
+
+def test_require_namespace_skips_loaded(servers):
+    repl = ClojureREPL()
+    server = servers["7888"]
+    repl.require_namespace("my.ns")
+    assert repl.require_namespace("my.ns") == "Already required: my.ns"
+    assert server.count("(require 'my.ns)") == 1
+
+
+@pytest.mark.parametrize("namespace", [
+    "my.ns :reload", "my.ns :reload-all", "[my.ns :as m]",
+])
+def test_require_namespace_always_sends_libspecs(servers, namespace):
+    repl = ClojureREPL()
+    repl.require_namespace(namespace)
+    repl.require_namespace(namespace)
+    assert servers["7888"].count(f"(require '{namespace})") == 2
+
+
+def test_require_namespace_forgets_after_ns_change(servers):
+    repl = ClojureREPL()
+    repl.require_namespace("my.ns")
+    repl.eval_clojure("(ns my.ns)")
+    repl.require_namespace("my.ns")
+    repl.eval_clojure("(remove-ns 'my.ns)")
+    repl.require_namespace("my.ns")
+    repl.eval_clojure("(def x 1)")
+    repl.require_namespace("my.ns")
+    assert servers["7888"].count("(require 'my.ns)") == 3
+
+
+def test_require_namespace_failure_not_remembered(servers):
+    repl = ClojureREPL()
+    server = servers["7888"]
+    server.errors["(require 'missing.ns)"] = "Could not locate missing/ns.clj"
+    assert "Errors:\nCould not locate" in repl.require_namespace("missing.ns")
+    repl.require_namespace("missing.ns")
+    assert server.count("(require 'missing.ns)") == 2
+
+
+def _batch_value(*fields):
+    """Print a batch result as the batch template does: a string holding
+    the printed vector of strings."""
+    vector = "[" + " ".join(json.dumps(field) for field in fields) + "]"
+    return json.dumps(vector)
+
+
+def test_batch_eval_results_in_order(servers):
+    repl = ClojureREPL()
+    sent = []
+
+    def handler(code):
+        if code.startswith("(clojure.core/let [f"):
+            sent.append(code)
+            return [
+                {"err": "Reflection warning\n"},
+                {"value": _batch_value(
+                    "hi\n", "3", "",
+                    "partial\n", "", "WARNING: x\njava.lang.Exception: boom",
+                )},
+            ]
+
+    servers["7888"].handler = handler
+    result = repl.batch_eval(["(do (println \"hi\") 3)", "(boom)"])
+    assert result == (
+        "=== (do (println \"hi\") 3)\nOutput:\nhi\n\nResult: 3\n\n"
+        "=== (boom)\nOutput:\npartial\n\nErrors:\nWARNING: x\njava.lang.Exception: boom\n\n"
+        "=== Outside any form\nErrors:\nReflection warning\n"
+    )
+    # Each form is compiled only when its thunk runs
+    assert "(clojure.core/eval (quote (do (boom)\n)))" in sent[0]
+
+
+def test_batch_eval_rejects_short_result(servers):
+    repl = ClojureREPL()
+    servers["7888"].handler = lambda code: [{"value": _batch_value("", "1", "")}]
+    result = repl.batch_eval(["1", "2"])
+    assert result.startswith("Error")
+    assert "Expected 6 strings in the batch result, got 3" in result
+
+
+def test_batch_eval_empty(servers):
+    assert ClojureREPL().batch_eval([]) == "No forms to evaluate"
+
+
+def test_batch_eval_forgets_required_after_ns_change(servers):
+    repl = ClojureREPL()
+    servers["7888"].handler = lambda code: (
+        [{"value": _batch_value("", "nil", "")}]
+        if code.startswith("(clojure.core/let [f") else None
+    )
+    repl.require_namespace("my.ns")
+    repl.batch_eval(["(ns my.ns)"])
+    repl.require_namespace("my.ns")
+    assert servers["7888"].count("(require 'my.ns)") == 2